@@ -1,6 +1,7 @@
 import os
+import shutil
 from pathlib import Path
-from datetime import datetime as dt
+from typing import Optional
 
 import numpy as np
 import pandas as pd
@@ -8,14 +9,25 @@ import streamlit as st
 import plotly.express as px
 from plotly.subplots import make_subplots
 import plotly.graph_objects as go
+import plotly.io as pio
 import streamlit.components.v1 as components
-from PIL import Image
+
+from citibike.io import read_map_html, read_table, write_atomic
+from citibike.transforms import daily_from_trips, downcast, downsample_minmax, parse_dates
+
+# ----------------------------
+# Plotly JSON encoding (orjson is much faster than the stdlib encoder)
+# ----------------------------
+pio.json.config.default_engine = "orjson"
 
 # ----------------------------
 # Base directory (this .py file)
 # ----------------------------
 BASE_DIR = Path(__file__).resolve().parent
 
+# Served at app/static/ (enableStaticServing in .streamlit/config.toml)
+STATIC_DIR = BASE_DIR / "static"
+
 # ----------------------------
 # Page config
 # ----------------------------
@@ -30,114 +42,246 @@ TRIPS_PATH = "Data/Processed/trips_weather.csv"
 TOP20_PATH = "Data/Processed/top20_station.csv"
 MAP_PATH = "Notebooks/MAPPS/kepler_top300.html"
 
+# Where the exported map may live, in lookup order
+MAP_CANDIDATES = [
+    MAP_PATH,
+    "maps/kepler_top300.html",
+    str(BASE_DIR / "Notebooks" / "MAPPS" / "kepler_top300.html"),
+    str(BASE_DIR / "maps" / "kepler_top300.html"),
+]
+
+# Columns build_daily can consume (any schema variant); others are never parsed
+TRIPS_COLUMNS = [
+    "date",
+    "trip_count", "avgTemp",
+    "daily_trips", "temp_avg_c",
+    "ride_id", "trip_id", "id",
+    "TAVG", "avg_temp", "temperature",
+]
+
+# Columns the bar chart page plots from top20_station.csv
+TOP20_COLUMNS = ["start_station_name", "value"]
+
+# Calendar months per season for the weather page filter
+SEASON_MONTHS = {
+    "Winter": [12, 1, 2],
+    "Spring": [3, 4, 5],
+    "Summer": [6, 7, 8],
+    "Fall": [9, 10, 11],
+}
+
+# Max points per trace sent to the browser on the dual-axis chart
+MAX_CHART_POINTS = 1000
+
 # ----------------------------
 # Helpers
 # ----------------------------
-def _read_csv(path: str, **kwargs) -> pd.DataFrame:
-    if not os.path.exists(path):
+def _read_csv(path: str, columns=None) -> pd.DataFrame:
+    try:
+        return read_table(path, columns=columns)
+    except FileNotFoundError:
         st.error(f"Missing required file: {path}")
         st.stop()
-    return pd.read_csv(path, **kwargs)
+
+def _daily_from_columns(df: pd.DataFrame, trips_col: str, temp_col: str) -> pd.DataFrame:
+    """Project an already-daily frame to date, trips, avg_temp."""
+    out = df[["date", trips_col, temp_col]].rename(
+        columns={trips_col: "trips", temp_col: "avg_temp"}
+    )
+    out["date"] = parse_dates(out["date"])
+    out = out.dropna(subset=["date"])
+    # daily exports are usually already in date order; only sort if not
+    if not out["date"].is_monotonic_increasing:
+        out = out.sort_values("date", kind="mergesort")
+    return out
 
 def build_daily(df: pd.DataFrame) -> pd.DataFrame:
     """Return a daily dataframe with columns: date, trips, avg_temp.
 
     Supports multiple upstream schemas (notebook variants / processed variants).
     """
-    if "date" not in df.columns:
+    # Schema detection is a handful of hashed set lookups
+    cols = frozenset(df.columns)
+    if "date" not in cols:
         st.error(f"Trips data is missing a 'date' column. Available columns: {list(df.columns)}")
         st.stop()
 
-    d = df.copy()
-    d["date"] = pd.to_datetime(d["date"], errors="coerce")
-    d = d.dropna(subset=["date"])
-
     # Case 1: already daily, notebook style
-    if {"trip_count", "avgTemp"}.issubset(d.columns):
-        out = d.sort_values("date")[["date", "trip_count", "avgTemp"]].rename(
-            columns={"trip_count": "trips", "avgTemp": "avg_temp"}
-        )
-        return out
+    if {"trip_count", "avgTemp"} <= cols:
+        return _daily_from_columns(df, "trip_count", "avgTemp")
 
     # Case 2: already daily, processed daily style
-    if {"daily_trips", "temp_avg_c"}.issubset(d.columns):
-        out = d.sort_values("date")[["date", "daily_trips", "temp_avg_c"]].rename(
-            columns={"daily_trips": "trips", "temp_avg_c": "avg_temp"}
-        )
-        return out
+    if {"daily_trips", "temp_avg_c"} <= cols:
+        return _daily_from_columns(df, "daily_trips", "temp_avg_c")
 
     # Case 3: trip-level with ride_id + weather temp column
-    trip_id_col = "ride_id" if "ride_id" in d.columns else None
-    if trip_id_col is None:
-        # fallback common identifiers
-        for cand in ["trip_id", "id"]:
-            if cand in d.columns:
-                trip_id_col = cand
-                break
-
-    temp_col = None
-    for cand in ["TAVG", "avg_temp", "avgTemp", "temp_avg_c", "temperature"]:
-        if cand in d.columns:
-            temp_col = cand
-            break
+    # first match wins, so the tuples are in priority order
+    trip_id_col = next((c for c in ("ride_id", "trip_id", "id") if c in cols), None)
+    temp_col = next(
+        (c for c in ("TAVG", "avg_temp", "avgTemp", "temp_avg_c", "temperature") if c in cols),
+        None,
+    )
 
     if trip_id_col is None:
         st.error(
             "Could not find a trip id column to count trips. "
-            f"Expected 'ride_id' (or similar). Available columns: {list(d.columns)}"
+            f"Expected 'ride_id' (or similar). Available columns: {list(df.columns)}"
         )
         st.stop()
 
     if temp_col is None:
         st.error(
             "Could not find a temperature column for the weather line. "
-            f"Expected one of ['TAVG','avgTemp','temp_avg_c',...]. Available columns: {list(d.columns)}"
+            f"Expected one of ['TAVG','avgTemp','temp_avg_c',...]. Available columns: {list(df.columns)}"
         )
         st.stop()
 
-    # Aggregate to day
-    d["day"] = d["date"].dt.floor("D")
-    daily = (
-        d.groupby("day", as_index=False)
-        .agg(
-            trips=(trip_id_col, "count"),
-            avg_temp=(temp_col, "mean"),
-        )
-        .rename(columns={"day": "date"})
-        .sort_values("date")
+    # Aggregate to day (one Arrow group_by over the three columns)
+    return daily_from_trips(df["date"], df[temp_col], df[trip_id_col].notna())
+
+def _mtime(path: str) -> Optional[float]:
+    """Source file mtime, used to key the on-disk load caches."""
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+# Loaded separately so each page only parses the file it plots; persisted
+# to disk so container restarts skip parsing entirely
+@st.cache_data(persist="disk", max_entries=2, show_spinner=False)
+def load_trips(mtime: Optional[float] = None) -> pd.DataFrame:
+    return downcast(_read_csv(TRIPS_PATH, columns=TRIPS_COLUMNS))
+
+@st.cache_data(persist="disk", max_entries=2, show_spinner=False)
+def load_top20(mtime: Optional[float] = None) -> pd.DataFrame:
+    return downcast(_read_csv(TOP20_PATH, columns=TOP20_COLUMNS))
+
+@st.cache_data(show_spinner=False)
+def get_daily(season: str = "All", mtime: Optional[float] = None) -> pd.DataFrame:
+    """Daily trips/temperature for one season ("All" keeps the whole year).
+
+    Cached separately from the raw frame so page reruns only unpickle the
+    small daily result instead of re-aggregating every trip. ``mtime`` (the
+    trips CSV's) keys the cache like load_trips', so a replaced CSV is
+    re-aggregated.
+    """
+    trips = load_trips(mtime)
+    if season != "All":
+        months = parse_dates(trips["date"]).dt.month
+        trips = trips[months.isin(SEASON_MONTHS[season])]
+    return build_daily(trips)
+
+@st.cache_resource(show_spinner=False)
+def build_bar_fig(top20: pd.DataFrame) -> go.Figure:
+    """Top-20 start stations bar chart (built once per top20 frame)."""
+    fig_bar = px.bar(
+        top20,
+        x="start_station_name",
+        y="value",
+        title="Top 20 Most Popular Start Stations in NYC",
+        labels={"start_station_name": "Start Station", "value": "Trips"},
     )
+    fig_bar.update_layout(xaxis_tickangle=-45, height=600)
+    return fig_bar
 
-    return daily
+@st.cache_resource(show_spinner=False)
+def build_line_fig(season: str = "All", mtime: Optional[float] = None) -> go.Figure:
+    """Dual-axis daily trips vs temperature chart (built once per season and trips CSV version)."""
+    daily = get_daily(season, mtime)
 
-@st.cache_data
-def load_data():
-    df = _read_csv(TRIPS_PATH)
-    top20 = _read_csv(TOP20_PATH, index_col=0)
-    return df, top20
+    # -------------------------
+    # Downsample long series (multi-year inputs) before plotting
+    # -------------------------
+    daily_trips = daily.iloc[downsample_minmax(daily["trips"].to_numpy(np.float64), MAX_CHART_POINTS)]
+    daily_temp = daily.iloc[downsample_minmax(daily["avg_temp"].to_numpy(np.float64), MAX_CHART_POINTS)]
 
-# ----------------------------
-# Load data
-# ----------------------------
-df, top20 = load_data()
+    # -------------------------
+    # Plot Chart
+    # -------------------------
+    fig_line = make_subplots(specs=[[{"secondary_y": True}]])
 
-# ----------------------------
-# Sidebar navigation
-# ----------------------------
-page = st.sidebar.selectbox(
-    "Aspect Selector",
-    [
-        "Intro",
-        "Most popular stations",
-        "Weather component and bike usage",
-        "Interactive map",
-        "Recommendations",
-    ],
-)
+    # Plain, narrow NumPy arrays skip Plotly's per-value Series coercion
+    fig_line.add_trace(
+        go.Scattergl(
+            x=daily_trips["date"].values.astype("datetime64[ms]"),
+            y=daily_trips["trips"].to_numpy(np.int32),
+            name="Daily Trips",
+            mode="lines",
+            line=dict(color="#1f77b4", width=3, shape="linear"),
+        ),
+        secondary_y=False,
+    )
+
+    fig_line.add_trace(
+        go.Scattergl(
+            x=daily_temp["date"].values.astype("datetime64[ms]"),
+            y=daily_temp["avg_temp"].to_numpy(np.float32),
+            name="Avg Temp (°C)",
+            mode="lines",
+            line=dict(color="#d62728", width=3, shape="linear"),
+        ),
+        secondary_y=True,
+    )
+
+    fig_line.update_layout(
+        title="Daily Citi Bike Trips vs Average Temperature (NYC, 2022)",
+        xaxis_title="Date",
+        plot_bgcolor="white",
+        height=600,
+        uirevision="daily",
+    )
+
+    fig_line.update_yaxes(title_text="Trips", secondary_y=False)
+    fig_line.update_yaxes(title_text="Avg Temp (°C)", secondary_y=True)
+
+    return fig_line
+
+@st.cache_resource(show_spinner=False)
+def _first_map_path() -> Optional[str]:
+    return next((p for p in MAP_CANDIDATES if os.path.exists(p)), None)
+
+def resolve_map_path() -> Optional[str]:
+    """First existing map in MAP_CANDIDATES, looked up once per process.
+
+    Only a found path stays cached: a miss is looked up again on the next
+    visit, so a map exported while the app runs still shows up.
+    """
+    path = _first_map_path()
+    if path is None:
+        _first_map_path.clear()
+    return path
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_kepler_html(path: str, mtime: Optional[float] = None) -> str:
+    """Read the exported Kepler.gl map once per file version and reuse the string.
+
+    ``mtime`` only keys the cache, so a re-exported map is picked up
+    without restarting the app.
+    """
+    return read_map_html(path)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def publish_map(path: str, mtime: Optional[float] = None) -> Optional[str]:
+    """Copy the map into STATIC_DIR and return its app-relative URL.
+
+    Returns None if the copy cannot be written (e.g. read-only checkout).
+    """
+    target = STATIC_DIR / Path(path).name
+    try:
+        if not target.exists() or target.stat().st_mtime < os.path.getmtime(path):
+            STATIC_DIR.mkdir(exist_ok=True)
+            # A session serving the old copy never sees a half-written one
+            write_atomic(str(target), lambda tmp: shutil.copyfile(path, tmp))
+    except OSError:
+        return None
+    return f"app/static/{target.name}"
+
+@st.cache_resource(show_spinner=False)
+def load_image_bytes(path: Path) -> bytes:
+    """Read a page image once per process instead of on every render."""
+    return path.read_bytes()
 
 # ----------------------------
 # Intro
 # ----------------------------
-if page == "Intro":
+def render_intro():
     st.subheader("Purpose of the Dashboard")
 
     st.markdown(
@@ -161,7 +305,7 @@ if page == "Intro":
     intro_img_path = BASE_DIR / "bike_pic.jpg"
     if intro_img_path.exists():
         st.image(
-            str(intro_img_path),
+            load_image_bytes(intro_img_path),
             caption="Citi Bike usage across New York City",
             use_container_width=True
         )
@@ -169,7 +313,7 @@ if page == "Intro":
 # ----------------------------
 # Bar chart page
 # ----------------------------
-elif page == "Most popular stations":
+def render_stations():
     st.subheader("Top 20 Most Popular Start Stations")
 
     st.markdown(
@@ -189,7 +333,9 @@ elif page == "Most popular stations":
     """
 )
 
-    required_cols = {"start_station_name", "value"}
+    top20 = load_top20(_mtime(TOP20_PATH))
+
+    required_cols = set(TOP20_COLUMNS)
     if not required_cols.issubset(top20.columns):
         st.error(
             f"top20_station.csv is missing required columns. Expected {required_cols}, "
@@ -197,59 +343,22 @@ elif page == "Most popular stations":
         )
         st.stop()
 
-    fig_bar = px.bar(
-        top20,
-        x="start_station_name",
-        y="value",
-        title="Top 20 Most Popular Start Stations in NYC",
-        labels={"start_station_name": "Start Station", "value": "Trips"},
-    )
-    fig_bar.update_layout(xaxis_tickangle=-45, height=600)
-    st.plotly_chart(fig_bar, use_container_width=True)
+    st.plotly_chart(build_bar_fig(top20), use_container_width=True)
 
 # ----------------------------
 # Dual axis line chart page
 # ----------------------------
-elif page == "Weather component and bike usage":
-
+def render_weather():
     st.subheader("Trips vs Temperature Over Time")
 
-    # -------------------------
-    # Create Season Column
-    # -------------------------
-    df["date"] = pd.to_datetime(df["date"])
-    df["month"] = df["date"].dt.month
-
-    def month_to_season(m):
-        if m in [12, 1, 2]:
-            return "Winter"
-        elif m in [3, 4, 5]:
-            return "Spring"
-        elif m in [6, 7, 8]:
-            return "Summer"
-        else:
-            return "Fall"
-
-    df["season"] = df["month"].apply(month_to_season)
-
     # -------------------------
     # Sidebar Season Filter
     # -------------------------
     season_choice = st.sidebar.selectbox(
         "Select Season",
-        ["All", "Winter", "Spring", "Summer", "Fall"]
+        ["All", *SEASON_MONTHS]
     )
 
-    if season_choice != "All":
-        filtered_df = df[df["season"] == season_choice]
-    else:
-        filtered_df = df.copy()
-
-    # -------------------------
-    # Build Daily Data AFTER filtering
-    # -------------------------
-    daily = build_daily(filtered_df)
-
     st.markdown("""
 ### Weather Impact on Citi Bike Ridership
 
@@ -260,47 +369,12 @@ The analysis highlights a strong seasonal relationship, where bike usage general
 This insight supports operational planning, demand forecasting, and strategic decision-making by helping stakeholders anticipate seasonal fluctuations in bike usage.
 """)
 
-    # -------------------------
-    # Plot Chart
-    # -------------------------
-    fig_line = make_subplots(specs=[[{"secondary_y": True}]])
-
-    fig_line.add_trace(
-        go.Scatter(
-            x=daily["date"],
-            y=daily["trips"],
-            name="Daily Trips",
-            line=dict(color="#1f77b4", width=3),
-        ),
-        secondary_y=False,
-    )
-
-    fig_line.add_trace(
-        go.Scatter(
-            x=daily["date"],
-            y=daily["avg_temp"],
-            name="Avg Temp (°C)",
-            line=dict(color="#d62728", width=3),
-        ),
-        secondary_y=True,
-    )
-
-    fig_line.update_layout(
-        title="Daily Citi Bike Trips vs Average Temperature (NYC, 2022)",
-        xaxis_title="Date",
-        plot_bgcolor="white",
-        height=600,
-    )
-
-    fig_line.update_yaxes(title_text="Trips", secondary_y=False)
-    fig_line.update_yaxes(title_text="Avg Temp (°C)", secondary_y=True)
-
-    st.plotly_chart(fig_line, use_container_width=True)
+    st.plotly_chart(build_line_fig(season_choice, _mtime(TRIPS_PATH)), use_container_width=True)
 
 # ----------------------------
 # Kepler map
 # ----------------------------
-elif page == "Interactive map":
+def render_map():
     st.subheader("Kepler.gl Map: Trip Patterns in NYC")
 
     with st.expander("How to read this map", expanded=True):
@@ -322,35 +396,32 @@ elif page == "Interactive map":
             """
         )
 
-    candidate_paths = [
-        MAP_PATH,
-        "maps/kepler_top300.html",
-        str(BASE_DIR / "Notebooks" / "MAPPS" / "kepler_top300.html"),
-        str(BASE_DIR / "maps" / "kepler_top300.html"),
-    ]
-    map_found = next((p for p in candidate_paths if os.path.exists(p)), None)
+    map_found = resolve_map_path()
 
     if map_found is None:
-        st.error(f"Map file not found. Tried: {candidate_paths}")
+        st.error(f"Map file not found. Tried: {MAP_CANDIDATES}")
         st.stop()
 
-    with open(map_found, "r", encoding="utf-8") as f:
-        html_data = f.read()
-
-    # ✅ this must be indented
-    components.html(html_data, height=800, scrolling=True)
+    # Prefer an HTTP-served iframe (browser-cacheable); inline the HTML only
+    # when the static copy could not be written
+    map_mtime = _mtime(map_found)
+    map_url = publish_map(map_found, map_mtime)
+    if map_url is not None:
+        components.iframe(map_url, height=800, scrolling=True)
+    else:
+        components.html(get_kepler_html(map_found, map_mtime), height=800, scrolling=True)
 
 
 # ----------------------------
 # Recommendations
 # ----------------------------
-elif page == "Recommendations":
+def render_recommendations():
     st.subheader("Recommendations")
 
     rec_img_path = BASE_DIR / "business_pic.jpg"
     if rec_img_path.exists():
         st.image(
-            str(rec_img_path),
+            load_image_bytes(rec_img_path),
             caption="Strategic recommendations for Citi Bike operations",
             use_container_width=True,
         )
@@ -372,3 +443,17 @@ elif page == "Recommendations":
     ### 4. Use Geospatial Insights
     The Kepler.gl map highlights high-traffic travel corridors across the city, revealing how riders move between neighborhoods. These spatial patterns can inform infrastructure investments, such as protected bike lanes, station expansion, and street design improvements. They also provide evidence to support data-driven policy decisions related to urban mobility and sustainability.
     """)
+
+# ----------------------------
+# Sidebar navigation
+# ----------------------------
+PAGES = {
+    "Intro": render_intro,
+    "Most popular stations": render_stations,
+    "Weather component and bike usage": render_weather,
+    "Interactive map": render_map,
+    "Recommendations": render_recommendations,
+}
+
+page = st.sidebar.selectbox("Aspect Selector", list(PAGES))
+PAGES[page]()
@@ -1,5 +1,6 @@
 import os
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -7,6 +8,9 @@ import plotly.io as pio
 import streamlit as st
 from streamlit.components.v1 import html as st_html
 
+from citibike.io import read_map_html, read_table
+from citibike.transforms import daily_from_trips, top_categories
+
 # -----------------------------
 # Global Plotly light theme
 # -----------------------------
@@ -26,18 +30,118 @@ st.write(
 # -----------------------------
 # Load data
 # -----------------------------
+# Only the columns the charts use
+COLUMNS = ["ride_id", "start_station_name", "date", "TAVG"]
+STATION_COL = "start_station_name"
+
 @st.cache_data
 def load_data():
     # Your CSV is in the project root based on your directory listing
-    df = pd.read_csv("citibike_weather_2022.csv")
+    path = "citibike_weather_2022.csv"
+
+    # Through the Parquet sidecar (citibike.io): the CSV is parsed once,
+    # dates come back as datetime64 and only COLUMNS are decoded
+    df = read_table(path, columns=COLUMNS)
+
+    # Compact dtypes: float32 temperature, station names as category codes
+    df["TAVG"] = df["TAVG"].astype("float32")
+    df[STATION_COL] = df[STATION_COL].astype("category")
     return df
 
 df = load_data()
 
-# Ensure correct dtypes
-df["started_at"] = pd.to_datetime(df["started_at"], errors="coerce")
-df["date"] = pd.to_datetime(df["date"], errors="coerce")
-df["TAVG"] = pd.to_numeric(df["TAVG"], errors="coerce")
+# -----------------------------
+# Cached aggregations (df does not change between reruns)
+# -----------------------------
+# Largest value the top-N slider allows; counted once, sliced per rerun
+TOP_N_MAX = 30
+
+@st.cache_data
+def top_stations() -> pd.DataFrame:
+    # bincount over the category codes; only the top TOP_N_MAX get sorted
+    counts = top_categories(df[STATION_COL], TOP_N_MAX)
+    return counts.rename_axis(STATION_COL).reset_index(name="trip_count")
+
+@st.cache_data
+def daily_trips_temp() -> pd.DataFrame:
+    # One Arrow hash-aggregate pass for count + mean (citibike.transforms)
+    daily = daily_from_trips(df["date"], df["TAVG"], df["ride_id"].notna())
+    return daily.dropna(subset=["avg_temp"]).reset_index(drop=True)
+
+@st.cache_resource(max_entries=2)
+def load_map_html(path: str, mtime: float) -> str:
+    # Read once per file version (mtime only keys the cache); prefers a
+    # current .gz from tools/precompress_maps.py
+    return read_map_html(path)
+
+# -----------------------------
+# Cached figures (immutable once built; st.plotly_chart only serialises them)
+# -----------------------------
+@st.cache_resource
+def build_bar_figure(top_n: int) -> go.Figure:
+    station_col = STATION_COL
+    popular = top_stations().head(top_n)
+
+    fig_bar = px.bar(
+        popular,
+        x="trip_count",
+        y=station_col,
+        orientation="h",
+        labels={"trip_count": "Number of Trips", station_col: "Station"},
+        color_discrete_sequence=["#1f77b4"],
+    )
+    fig_bar.update_layout(height=600, title_x=0.02)
+    fig_bar.update_yaxes(categoryorder="total ascending")
+    return fig_bar
+
+@st.cache_resource
+def build_dual_figure() -> go.Figure:
+    daily = daily_trips_temp()
+
+    # Both traces share one datetime64[ms] x array; with int32/float32 y
+    # arrays Plotly serialises typed buffers instead of coercing Series
+    x = daily["date"].values.astype("datetime64[ms]")
+
+    fig_dual = go.Figure()
+    fig_dual.add_trace(
+        go.Scatter(
+            x=x, y=daily["trips"].to_numpy(np.int32),
+            name="Trips",
+            mode="lines",
+            line=dict(color="#1f77b4", width=2, shape="linear"),
+            yaxis="y1",
+        )
+    )
+    fig_dual.add_trace(
+        go.Scatter(
+            x=x, y=daily["avg_temp"].to_numpy(np.float32),
+            name="Avg Temp (TAVG)",
+            mode="lines",
+            line=dict(color="#ff7f0e", width=2, shape="linear"),
+            yaxis="y2",
+        )
+    )
+
+    fig_dual.update_layout(
+        xaxis=dict(title="Date"),
+        yaxis=dict(title="Trips"),
+        yaxis2=dict(title="Avg Temperature (TAVG)", overlaying="y", side="right"),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0),
+        height=600,
+        uirevision="daily",
+    )
+    return fig_dual
+
+# -----------------------------
+# Bar chart: Top stations
+# (a fragment, so the slider only reruns this chart, not the dual-axis one)
+# -----------------------------
+@st.fragment
+def popular_stations_chart():
+    st.subheader("Most Popular Start Stations")
+
+    top_n = st.slider("Select top N stations", 5, TOP_N_MAX, 15)
+    st.plotly_chart(build_bar_figure(top_n), use_container_width=True)
 
 # -----------------------------
 # Layout
@@ -51,78 +155,21 @@ with tab1:
     # Bar chart: Top stations
     # -----------------------------
     with col1:
-        st.subheader("Most Popular Start Stations")
-
-        station_col = "start_station_name"
-        top_n = st.slider("Select top N stations", 5, 30, 15)
-
-        popular = df[station_col].value_counts().head(top_n).reset_index()
-        popular.columns = [station_col, "trip_count"]
-
-        fig_bar = px.bar(
-            popular,
-            x="trip_count",
-            y=station_col,
-            orientation="h",
-            labels={"trip_count": "Number of Trips", station_col: "Station"},
-            color_discrete_sequence=["#1f77b4"],
-        )
-        fig_bar.update_layout(height=600, title_x=0.02)
-        fig_bar.update_yaxes(categoryorder="total ascending")
-
-        st.plotly_chart(fig_bar, use_container_width=True)
+        popular_stations_chart()
 
     # -----------------------------
     # Dual-axis chart: Trips vs TAVG
     # -----------------------------
     with col2:
         st.subheader("Daily Trips vs Average Temperature (TAVG)")
-
-        daily = (
-            df.dropna(subset=["date"])
-              .groupby("date", as_index=False)
-              .agg(trips=("ride_id", "count"), avg_temp=("TAVG", "mean"))
-              .dropna(subset=["avg_temp"])
-        )
-
-        fig_dual = go.Figure()
-        fig_dual.add_trace(
-            go.Scatter(
-                x=daily["date"], y=daily["trips"],
-                name="Trips",
-                mode="lines",
-                line=dict(color="#1f77b4", width=2),
-                yaxis="y1",
-            )
-        )
-        fig_dual.add_trace(
-            go.Scatter(
-                x=daily["date"], y=daily["avg_temp"],
-                name="Avg Temp (TAVG)",
-                mode="lines",
-                line=dict(color="#ff7f0e", width=2),
-                yaxis="y2",
-            )
-        )
-
-        fig_dual.update_layout(
-            xaxis=dict(title="Date"),
-            yaxis=dict(title="Trips"),
-            yaxis2=dict(title="Avg Temperature (TAVG)", overlaying="y", side="right"),
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0),
-            height=600,
-        )
-
-        st.plotly_chart(fig_dual, use_container_width=True)
+        st.plotly_chart(build_dual_figure(), use_container_width=True)
 
 with tab2:
     st.subheader("Kepler.gl Map: Top 300 Routes")
 
     map_path = "maps/kepler_top300.html"  # your exported top-300 map
     if os.path.exists(map_path):
-        with open(map_path, "r", encoding="utf-8") as f:
-            map_html = f.read()
-        st_html(map_html, height=750, scrolling=True)
+        st_html(load_map_html(map_path, os.path.getmtime(map_path)), height=750, scrolling=True)
     else:
         st.error(
             "Map file not found. Please export it first:\n"
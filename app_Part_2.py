@@ -5,9 +5,14 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import plotly.io as pio
+import pydeck as pdk
 import streamlit as st
 from streamlit.components.v1 import html as st_html
 
+from citibike.io import read_map_html, read_table
+from citibike.summaries import DAY_NAMES, SAMPLE_PATH, SUMMARY_DIR, TOP_N_MAX
+from citibike.transforms import daily_from_day_codes, day_codes, parse_dates, top_categories
+
 # -----------------------------
 # Global style
 # -----------------------------
@@ -19,56 +24,108 @@ st.set_page_config(
 )
 
 # -----------------------------
-# Load reduced sample (under 25MB)
+# Load reduced sample (SAMPLE_PATH and the summary layout: citibike.summaries)
 # -----------------------------
+# Final dtypes applied by load_data
+FLOAT32_COLUMNS = ["TAVG", "trip_minutes", "start_lat", "start_lng", "end_lat", "end_lng"]
+STRING_DTYPES = {
+    "ride_id": "string[pyarrow]",
+    "start_station_name": "category",
+    "member_casual": "category",
+}
+
+# Columns the pages use; anything else in the file is never decoded
+COLUMNS = [
+    "ride_id", "started_at", "ended_at", "date", "TAVG",
+    "start_lat", "start_lng", "end_lat", "end_lng",
+    "start_station_name", "member_casual", "trip_minutes",
+]
+
 @st.cache_data
 def load_data():
     # Use your existing small sample (shown in your folder screenshot)
     # If your file is elsewhere, update this one line.
-    return pd.read_csv("Data/Processed/sample_citibike_2022.csv")
-
-df = load_data()
-
-# -----------------------------
-# Robust type handling (no KeyErrors)
-# -----------------------------
-
-# started_at (required for time series)
-if "started_at" in df.columns:
-    df["started_at"] = pd.to_datetime(df["started_at"], errors="coerce")
-else:
-    st.error("Column 'started_at' is missing from the dataset. The dashboard needs it.")
-    st.stop()
-
-# date (derive from started_at if missing)
-if "date" in df.columns:
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-else:
-    df["date"] = pd.to_datetime(df["started_at"].dt.date, errors="coerce")
+    # Read through the typed Parquet sidecar (<csv>.parquet, built on first
+    # load or by tools/convert_to_parquet.py); missing columns are skipped
+    df = read_table(SAMPLE_PATH, columns=COLUMNS)
+
+    # -----------------------------
+    # Robust type handling (no KeyErrors), inside the cache so reruns
+    # get the finished frame instead of re-coercing it
+    # -----------------------------
+
+    # started_at (required for time series)
+    if "started_at" in df.columns:
+        df["started_at"] = parse_dates(df["started_at"])
+    else:
+        st.error("Column 'started_at' is missing from the dataset. The dashboard needs it.")
+        st.stop()
 
-# temperature column (TAVG)
-if "TAVG" in df.columns:
-    df["TAVG"] = pd.to_numeric(df["TAVG"], errors="coerce")
-else:
-    # Allow app to run even if TAVG missing, but temperature chart won’t work
-    df["TAVG"] = np.nan
-
-# coordinates (only if present)
-for c in ["start_lat", "start_lng", "end_lat", "end_lng"]:
-    if c in df.columns:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-
-# trip duration (optional)
-# If trip_minutes already exists, keep it numeric
-if "trip_minutes" in df.columns:
-    df["trip_minutes"] = pd.to_numeric(df["trip_minutes"], errors="coerce")
-else:
-    # compute only if ended_at exists
-    if "ended_at" in df.columns:
-        df["ended_at"] = pd.to_datetime(df["ended_at"], errors="coerce")
-        df["trip_minutes"] = (df["ended_at"] - df["started_at"]).dt.total_seconds() / 60
+    # date (derive from started_at if missing)
+    if "date" in df.columns:
+        df["date"] = parse_dates(df["date"])
     else:
-        df["trip_minutes"] = np.nan  # available but empty
+        df["date"] = df["started_at"].dt.normalize()
+
+    # int32 day code (days since 1970-01-01) as the daily group key
+    df["date_code"] = day_codes(df["date"])
+
+    # day of week (Monday=0), as int8 so Extra Insight can bincount it;
+    # -1 where the date is missing
+    df["dow"] = df["date"].dt.dayofweek.fillna(-1).astype("int8")
+
+    # temperature column (TAVG)
+    if "TAVG" not in df.columns:
+        # Allow app to run even if TAVG missing, but temperature chart won’t work
+        df["TAVG"] = np.nan
+
+    # trip duration (optional)
+    # If trip_minutes already exists, it is cast with the other numerics below
+    if "trip_minutes" not in df.columns:
+        # compute only if ended_at exists
+        if "ended_at" in df.columns:
+            df["ended_at"] = parse_dates(df["ended_at"])
+            # Plain datetime64 arithmetic: whatever the stored unit, dividing
+            # by one minute gives float minutes and NaT becomes NaN
+            elapsed = df["ended_at"].to_numpy() - df["started_at"].to_numpy()
+            df["trip_minutes"] = elapsed / np.timedelta64(1, "m")
+        else:
+            df["trip_minutes"] = np.nan  # available but empty
+
+    # Numeric columns (TAVG, trip_minutes, coordinates): the Parquet sidecar
+    # stores them typed, so only text columns need the coercing parse
+    present = [c for c in FLOAT32_COLUMNS if c in df.columns]
+    for c in present:
+        if not pd.api.types.is_numeric_dtype(df[c]):
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+
+    # Final dtypes in one astype call:
+    # - float32 halves the bytes every mean/aggregate scans; ample precision
+    #   for temperatures, minutes and ~1 m coordinates
+    # - ride_id is unique per row, so category codes would not help; keep it
+    #   Arrow-backed (contiguous buffer + validity bitmap) instead of Python
+    #   objects, which makes the trip-count notna() a bitmap read
+    # - low-cardinality strings as category codes: less memory, and isin /
+    #   value_counts work on integer codes instead of hashing strings
+    dtypes = {c: "float32" for c in present}
+    dtypes.update({c: t for c, t in STRING_DTYPES.items() if c in df.columns})
+    df = df.astype(dtypes)
+
+    # Keep trips in start-time order (once, inside the cache) so each day's
+    # rows are contiguous for the per-day reductions
+    if not df["started_at"].is_monotonic_increasing:
+        df = df.sort_values("started_at", kind="mergesort", ignore_index=True)
+
+    return df
+
+@st.cache_data
+def load_rider_types():
+    """Sorted rider types, read from the member_casual column alone (None if absent)."""
+    riders = read_table(SAMPLE_PATH, columns=["member_casual"])
+    if "member_casual" not in riders.columns:
+        return None
+    # Categories are the sorted distinct non-null values, in one pass
+    return list(riders["member_casual"].astype("category").cat.categories)
 
 # -----------------------------
 # Sidebar navigation (pages)
@@ -86,14 +143,192 @@ page = st.sidebar.selectbox("Select a page", pages)
 # Optional filters (available across pages)
 st.sidebar.markdown("### Filters")
 
-if "member_casual" in df.columns:
-    rider_options = sorted([x for x in df["member_casual"].dropna().unique()])
+rider_options = load_rider_types()
+if rider_options is not None:
     member_filter = st.sidebar.multiselect("Rider type", options=rider_options, default=rider_options)
-    df_f = df[df["member_casual"].isin(member_filter)].copy()
+    # Hashable, order-independent cache key for the per-filter aggregates.
+    # None means no filtering: every rider type selected (the default)
+    # shares the unfiltered caches and the prebuilt summaries.
+    if set(member_filter) == set(rider_options):
+        members = None
+    else:
+        members = tuple(sorted(member_filter))
 else:
-    df_f = df.copy()
+    members = None
     st.sidebar.info("No 'member_casual' column found; rider-type filter disabled.")
 
+# -----------------------------
+# Cached per-filter aggregates (the trip sample is only loaded when a page
+# needs it: a rider filter is set, a summary is missing, or the Intro KPIs)
+# -----------------------------
+def filter_riders(members) -> pd.DataFrame:
+    """Rows of the trip sample for the selected rider types (all if members is None)."""
+    df = load_data()
+    if members is None:
+        return df
+    return df[df["member_casual"].isin(members)]
+
+@st.cache_data
+def load_summary(path: str, mtime: float) -> pd.DataFrame:
+    return pd.read_parquet(path)
+
+def summary_version(name: str):
+    """``(path, mtime)`` of a prebuilt summary at least as new as the sample, else None."""
+    path = os.path.join(SUMMARY_DIR, f"{name}.parquet")
+    if not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    if os.path.exists(SAMPLE_PATH) and mtime < os.path.getmtime(SAMPLE_PATH):
+        return None
+    return path, mtime
+
+def source_version(name: str, members):
+    """The summary ``aggregate`` reads for ``members`` (see summary_version), else None."""
+    return summary_version(name) if members is None else None
+
+def aggregate(name: str, func, members):
+    """``func(members)``, or its prebuilt summary when no rider filter applies."""
+    version = source_version(name, members)
+    if version is not None:
+        return load_summary(*version)
+    return func(members)
+
+@st.cache_data
+def daily_trips_temp(members) -> pd.DataFrame:
+    d = filter_riders(members)
+    # One pass for count + mean over the three columns (citibike.transforms);
+    # without ride_id every row counts as a trip
+    if "ride_id" in d.columns:
+        counted = d["ride_id"].notna()
+    else:
+        counted = pd.Series(True, index=d.index)
+    daily = daily_from_day_codes(d["date_code"].to_numpy(), d["TAVG"], counted)
+    return daily.dropna(subset=["avg_temp"]).reset_index(drop=True)
+
+@st.cache_data
+def station_counts(members):
+    # Counted once per filter (bincount over the category codes); the Top N
+    # slider only slices the result. Stations the filter removed count 0.
+    d = filter_riders(members)
+    if "start_station_name" not in d.columns:
+        return None
+    counts = top_categories(d["start_station_name"], TOP_N_MAX)
+    return (
+        counts[counts > 0]
+        .rename_axis("start_station_name")
+        .reset_index(name="trip_count")
+    )
+
+@st.cache_data
+def dow_counts(members) -> pd.DataFrame:
+    # 7-bin count over the precomputed day codes, skipping missing dates
+    dow = filter_riders(members)["dow"].to_numpy()
+    return pd.DataFrame(
+        {
+            "day_of_week": DAY_NAMES,
+            "trip_count": np.bincount(dow[dow >= 0], minlength=7),
+        }
+    )
+
+@st.cache_data
+def intro_kpis(members) -> tuple:
+    """Trip count, unique start stations, mean trip minutes and mean TAVG."""
+    d = filter_riders(members)
+    n_stations = d["start_station_name"].nunique() if "start_station_name" in d.columns else None
+    return len(d), n_stations, d["trip_minutes"].mean(), d["TAVG"].mean()
+
+@st.cache_resource(max_entries=2)
+def load_map_html(path: str, mtime: float) -> str:
+    """The Top 300 Routes page's Kepler export, re-read only when ``mtime`` changes."""
+    return read_map_html(path)
+
+# -----------------------------
+# Figures per rider filter (and Top N), shared by every session viewing the
+# same selection. ``version`` is the source_version of the summary drawn; it
+# only keys the cache, so a rebuilt summary gets a new figure.
+# -----------------------------
+@st.cache_resource
+def build_trips_temp_figure(members, version=None) -> go.Figure:
+    daily = aggregate("daily", daily_trips_temp, members)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=daily["date"], y=daily["trips"],
+        name="Trips", mode="lines",
+        line=dict(color="#1f77b4", width=2),
+        yaxis="y1"
+    ))
+    fig.add_trace(go.Scatter(
+        x=daily["date"], y=daily["avg_temp"],
+        name="Avg Temp (TAVG)", mode="lines",
+        line=dict(color="#ff7f0e", width=2),
+        yaxis="y2"
+    ))
+
+    fig.update_layout(
+        xaxis=dict(title="Date"),
+        yaxis=dict(title="Trips"),
+        yaxis2=dict(title="Avg Temp (TAVG)", overlaying="y", side="right"),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0),
+        height=520
+    )
+    return fig
+
+@st.cache_resource
+def build_station_figure(members, top_n: int, version=None) -> go.Figure:
+    popular = aggregate("top_stations", station_counts, members).head(top_n)
+
+    fig = px.bar(
+        popular,
+        x="trip_count",
+        y="start_station_name",
+        orientation="h",
+        labels={"trip_count": "Trips", "start_station_name": "Station"},
+        color_discrete_sequence=["#1f77b4"]
+    )
+    fig.update_layout(height=650, title_x=0.02)
+    fig.update_yaxes(categoryorder="total ascending")
+    return fig
+
+@st.cache_resource
+def build_dow_figure(members, version=None) -> go.Figure:
+    counts = aggregate("dow", dow_counts, members)
+
+    fig = px.bar(
+        counts,
+        x="day_of_week",
+        y="trip_count",
+        labels={"day_of_week": "Day", "trip_count": "Trips"},
+        color_discrete_sequence=["#1f77b4"]
+    )
+    fig.update_layout(height=520)
+    return fig
+
+@st.cache_resource(max_entries=2)
+def build_routes_deck(path: str, mtime: float) -> pdk.Deck:
+    routes = load_summary(path, mtime)
+    arcs = pdk.Layer(
+        "ArcLayer",
+        data=routes,
+        get_source_position=["start_lng", "start_lat"],
+        get_target_position=["end_lng", "end_lat"],
+        get_source_color=[31, 119, 180],
+        get_target_color=[255, 127, 14],
+        get_width=f"1 + 4 * trips / {int(routes['trips'].max())}",
+        pickable=True,
+    )
+    view = pdk.ViewState(
+        latitude=float(routes["start_lat"].mean()),
+        longitude=float(routes["start_lng"].mean()),
+        zoom=11,
+        pitch=40,
+    )
+    return pdk.Deck(
+        layers=[arcs],
+        initial_view_state=view,
+        tooltip={"text": "{start_station_name} → {end_station_name}: {trips} trips"},
+    )
+
 # -----------------------------
 # PAGE: Intro
 # -----------------------------
@@ -117,17 +352,16 @@ if page == "Intro":
 
     # Quick KPIs (robust to missing columns)
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Trips (sample)", f"{len(df_f):,}")
+    n_trips, n_stations, avg_minutes, avg_tavg = intro_kpis(members)
+    col1.metric("Trips (sample)", f"{n_trips:,}")
 
-    if "start_station_name" in df_f.columns:
-        col2.metric("Unique start stations", f"{df_f['start_station_name'].nunique():,}")
+    if n_stations is not None:
+        col2.metric("Unique start stations", f"{n_stations:,}")
     else:
         col2.metric("Unique start stations", "N/A")
 
-    avg_minutes = df_f["trip_minutes"].dropna().mean()
     col3.metric("Avg trip minutes", f"{avg_minutes:.1f}" if np.isfinite(avg_minutes) else "N/A")
 
-    avg_tavg = df_f["TAVG"].dropna().mean()
     col4.metric("Avg TAVG", f"{avg_tavg:.1f}" if np.isfinite(avg_tavg) else "N/A")
 
 # -----------------------------
@@ -136,49 +370,13 @@ if page == "Intro":
 elif page == "Trips vs Temperature":
     st.header("Trips vs Average Temperature (TAVG)")
 
-    if df_f["TAVG"].dropna().empty:
+    # daily already drops days without a TAVG value
+    daily = aggregate("daily", daily_trips_temp, members)
+    if daily.empty:
         st.warning("TAVG is missing/empty in this dataset, so the temperature comparison cannot be plotted.")
         st.stop()
 
-    # daily aggregation
-    if "ride_id" in df_f.columns:
-        daily = (
-            df_f.dropna(subset=["date"])
-                .groupby("date", as_index=False)
-                .agg(trips=("ride_id", "count"), avg_temp=("TAVG", "mean"))
-                .dropna(subset=["avg_temp"])
-        )
-    else:
-        daily = (
-            df_f.dropna(subset=["date"])
-                .groupby("date", as_index=False)
-                .agg(trips=("started_at", "size"), avg_temp=("TAVG", "mean"))
-                .dropna(subset=["avg_temp"])
-        )
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=daily["date"], y=daily["trips"],
-        name="Trips", mode="lines",
-        line=dict(color="#1f77b4", width=2),
-        yaxis="y1"
-    ))
-    fig.add_trace(go.Scatter(
-        x=daily["date"], y=daily["avg_temp"],
-        name="Avg Temp (TAVG)", mode="lines",
-        line=dict(color="#ff7f0e", width=2),
-        yaxis="y2"
-    ))
-
-    fig.update_layout(
-        xaxis=dict(title="Date"),
-        yaxis=dict(title="Trips"),
-        yaxis2=dict(title="Avg Temp (TAVG)", overlaying="y", side="right"),
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0),
-        height=520
-    )
-
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(build_trips_temp_figure(members, source_version("daily", members)), use_container_width=True)
 
     st.markdown(
         """
@@ -194,32 +392,17 @@ elif page == "Trips vs Temperature":
 elif page == "Popular Stations":
     st.header("Most Popular Start Stations")
 
-    if "start_station_name" not in df_f.columns:
+    counts = aggregate("top_stations", station_counts, members)
+    if counts is None:
         st.warning("Column 'start_station_name' not found in this dataset.")
         st.stop()
 
-    top_n = st.slider("Top N stations", 10, 50, 20)
-
-    popular = (
-        df_f["start_station_name"]
-        .value_counts()
-        .head(top_n)
-        .reset_index()
-    )
-    popular.columns = ["start_station_name", "trip_count"]
+    top_n = st.slider("Top N stations", 10, TOP_N_MAX, 20)
 
-    fig = px.bar(
-        popular,
-        x="trip_count",
-        y="start_station_name",
-        orientation="h",
-        labels={"trip_count": "Trips", "start_station_name": "Station"},
-        color_discrete_sequence=["#1f77b4"]
+    st.plotly_chart(
+        build_station_figure(members, top_n, source_version("top_stations", members)),
+        use_container_width=True,
     )
-    fig.update_layout(height=650, title_x=0.02)
-    fig.update_yaxes(categoryorder="total ascending")
-
-    st.plotly_chart(fig, use_container_width=True)
 
     st.markdown(
         """
@@ -233,13 +416,24 @@ elif page == "Popular Stations":
 # PAGE: Top 300 Routes Map
 # -----------------------------
 elif page == "Top 300 Routes Map":
-    st.header("Kepler.gl Map: Top 300 Routes (by trip count)")
-
     map_path = "Notebooks/MAPPS/kepler_top300.html"
-    if os.path.exists(map_path):
-        with open(map_path, "r", encoding="utf-8") as f:
-            map_html = f.read()
-        st_html(map_html, height=750, scrolling=True)
+    routes_version = None if os.path.exists(map_path) else summary_version("top_routes")
+    if routes_version is not None and load_summary(*routes_version).empty:
+        routes_version = None  # no routes to draw (e.g. no station coordinates)
+
+    if routes_version is None:
+        st.header("Kepler.gl Map: Top 300 Routes (by trip count)")
+    else:
+        st.header("Top 300 Routes (by trip count)")
+
+    if os.path.exists(map_path) or routes_version is not None:
+        if routes_version is None:
+            st_html(load_map_html(map_path, os.path.getmtime(map_path)), height=750, scrolling=True)
+        else:
+            # No exported Kepler.gl HTML: draw the same top routes from the
+            # table tools/build_summaries.py writes
+            st.caption("Drawn from the top-routes summary (no Kepler.gl export found).")
+            st.pydeck_chart(build_routes_deck(*routes_version))
 
         st.markdown(
             """
@@ -258,29 +452,7 @@ elif page == "Top 300 Routes Map":
 elif page == "Extra Insight":
     st.header("Extra Insight: Trips by Day of Week")
 
-    df_tmp = df_f.dropna(subset=["date"]).copy()
-    df_tmp["day_of_week"] = df_tmp["date"].dt.day_name()
-
-    order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-
-    counts = (
-        df_tmp["day_of_week"]
-        .value_counts()
-        .reindex(order)
-        .reset_index()
-    )
-    counts.columns = ["day_of_week", "trip_count"]
-
-    fig = px.bar(
-        counts,
-        x="day_of_week",
-        y="trip_count",
-        labels={"day_of_week": "Day", "trip_count": "Trips"},
-        color_discrete_sequence=["#1f77b4"]
-    )
-    fig.update_layout(height=520)
-
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(build_dow_figure(members, source_version("dow", members)), use_container_width=True)
 
     st.markdown(
         """
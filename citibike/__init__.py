@@ -0,0 +1,8 @@
+"""Shared loading and aggregation code for the Citi Bike dashboards.
+
+``Dashboard-final.py``, ``app.py`` and ``app_Part_2.py`` import from here so
+the CSV/Parquet reader, the trip -> daily reduction, the chart downsampler
+and app_Part_2.py's summary-table layout (shared with tools/) exist once.
+Streamlit caching stays in the scripts, which decide what is cached per
+page.
+"""
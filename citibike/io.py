@@ -0,0 +1,107 @@
+"""Readers for the dashboards' CSV/Parquet inputs and exported maps."""
+import gzip
+import os
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+
+def read_table(path: str, columns=None) -> pd.DataFrame:
+    """Read ``path`` via a Parquet sidecar, parsing the CSV at most once.
+
+    ``<name>.csv`` is parsed into ``<name>.csv.parquet`` the first time (or
+    when the CSV is newer, or the sidecar cannot be read) and later reads
+    decode only ``columns`` from the sidecar; tools/convert_to_parquet.py
+    builds the same sidecars ahead of time. Parquet/Feather paths are read
+    directly. Names in ``columns`` that the file lacks are skipped.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+
+    cache_path = path if path.endswith((".parquet", ".feather")) else path + ".parquet"
+    if cache_path == path:
+        return _read_columns(path, columns)
+
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        try:
+            return _read_columns(cache_path, columns)
+        except (OSError, pa.ArrowException):
+            pass  # torn or corrupt sidecar: rebuild it from the CSV below
+
+    table = sidecar_table(pacsv.read_csv(path))  # multithreaded Arrow parser
+    try:
+        write_atomic(cache_path, lambda tmp: pq.write_table(table, tmp, compression="snappy"))
+    except OSError:
+        # Read-only checkout: keep working off the CSV
+        if columns is not None:
+            table = table.select([c for c in columns if c in table.column_names])
+        return table.to_pandas()
+    return _read_columns(cache_path, columns)
+
+
+def sidecar_table(table: pa.Table) -> pa.Table:
+    """Give a parsed CSV the layout every Parquet sidecar stores.
+
+    Shared by read_table's first load and tools/convert_to_parquet.py:
+    - an anonymous column (a pandas index saved with ``to_csv()``) is dropped
+    - Arrow infers plain dates as date32, which pandas turns into Python
+      ``datetime.date`` objects; they are stored as timestamps instead, so
+      they load as datetime64
+    """
+    table = table.drop_columns([n for n in table.column_names if n == "" or n.startswith("Unnamed: ")])
+    for i, field in enumerate(table.schema):
+        if pa.types.is_date(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.timestamp("s")))
+    return table
+
+
+def write_atomic(path: str, write) -> None:
+    """Call ``write(tmp_path)`` on a temp file next to ``path``, then move it into place.
+
+    Readers only ever see a missing file or a complete one: an interrupted
+    write, or two sessions writing at once, never leaves a torn ``path``.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    # A unique name, not mkstemp: ``write`` creates the file, so it gets the
+    # usual umask permissions rather than mkstemp's owner-only 0600
+    tmp = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _read_columns(cache_path: str, columns=None) -> pd.DataFrame:
+    is_feather = cache_path.endswith(".feather")
+
+    # Only decode the columns we use
+    if columns is not None:
+        if is_feather:
+            names = pa.ipc.open_file(cache_path).schema.names
+        else:
+            names = pq.read_schema(cache_path).names
+        columns = [c for c in columns if c in names]
+
+    if is_feather:
+        return pd.read_feather(cache_path, columns=columns)
+    return pd.read_parquet(cache_path, columns=columns)
+
+
+def read_map_html(path: str) -> str:
+    """Return an exported Kepler.gl map's HTML.
+
+    A current ``<path>.gz`` (tools/precompress_maps.py) is preferred, since
+    Kepler HTML shrinks several-fold and decompresses faster than it reads.
+    """
+    gz_path = path + ".gz"
+    if os.path.exists(gz_path) and os.path.getmtime(gz_path) >= os.path.getmtime(path):
+        with gzip.open(gz_path, "rt", encoding="utf-8") as f:
+            return f.read()
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
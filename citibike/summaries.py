@@ -0,0 +1,17 @@
+"""Where app_Part_2.py's prebuilt chart tables live and what they hold.
+
+tools/build_summaries.py writes the tables and app_Part_2.py reads them;
+both take these constants from here so the two cannot drift apart.
+"""
+
+# Reduced trip sample (under 25MB) the summaries are built from
+SAMPLE_PATH = "Data/Processed/sample_citibike_2022.csv"
+
+# One <name>.parquet per summary table
+SUMMARY_DIR = "Data/Processed/sample_summary"
+
+# Largest value of the Popular Stations slider; top_stations keeps this many
+TOP_N_MAX = 50
+
+# dow table order (Monday first, like Series.dt.dayofweek)
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
@@ -0,0 +1,122 @@
+"""Column coercion, the trip -> daily reduction and chart downsampling."""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+def downcast(df: pd.DataFrame) -> pd.DataFrame:
+    """Shrink int64/float64 columns to the smallest dtype that holds them."""
+    for c in df.select_dtypes("int64").columns:
+        df[c] = pd.to_numeric(df[c], downcast="integer")
+    for c in df.select_dtypes("float64").columns:
+        df[c] = pd.to_numeric(df[c], downcast="float")
+    return df
+
+
+def parse_dates(s: pd.Series) -> pd.Series:
+    """Coerce ISO date strings to datetime64 without per-row format guessing.
+
+    Columns that are already datetime64 (e.g. from a converted Parquet
+    sidecar) are returned as-is instead of being walked again.
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    return pd.to_datetime(s, format="ISO8601", errors="coerce", cache=True)
+
+
+# day_codes() value for a missing date
+MISSING_DAY = np.iinfo(np.int32).min
+
+
+def day_codes(dates: pd.Series) -> np.ndarray:
+    """int32 days since 1970-01-01 (Arrow's date32 layout); MISSING_DAY for NaT.
+
+    Half the width of datetime64 and directly usable as a daily group key.
+    """
+    days = parse_dates(dates).values.astype("datetime64[D]")
+    codes = days.view("int64").astype(np.int32)
+    codes[np.isnat(days)] = MISSING_DAY
+    return codes
+
+
+def daily_from_trips(dates: pd.Series, temps: pd.Series, counted: pd.Series) -> pd.DataFrame:
+    """Reduce trip rows to a daily frame with columns: date, trips, avg_temp.
+
+    ``counted`` is a boolean Series marking rows that count as a trip; rows
+    with an unparseable date are dropped and ``avg_temp`` skips missing
+    temperatures (NaN if a day has none). Works on the three arrays rather
+    than a copy of the whole trip table.
+    """
+    return daily_from_day_codes(day_codes(dates), temps, counted)
+
+
+def daily_from_day_codes(codes: np.ndarray, temps: pd.Series, counted: pd.Series) -> pd.DataFrame:
+    """``daily_from_trips`` for dates already reduced with ``day_codes``."""
+    codes = np.asarray(codes, dtype=np.int32)
+
+    # Arrow's multithreaded hash aggregate does the count + mean in one pass
+    # over the columnar buffers; the int32 codes are reinterpreted as date32
+    # without a copy, and missing days / NaN temperatures come through as nulls
+    table = pa.table(
+        {
+            "day": pa.array(codes, mask=codes == MISSING_DAY).view(pa.date32()),
+            "temp": pa.array(temps.to_numpy(np.float64), from_pandas=True),
+            "counted": pa.array(counted.to_numpy()),
+        }
+    )
+    agg = (
+        table.filter(pc.is_valid(table["day"]))
+        .group_by("day")
+        .aggregate([("counted", "sum"), ("temp", "mean")])
+        .sort_by("day")
+    )
+    return pd.DataFrame(
+        {
+            "date": agg["day"].to_numpy().astype("datetime64[ns]"),
+            "trips": agg["counted_sum"].to_numpy().astype(np.int64),
+            "avg_temp": agg["temp_mean"].to_numpy(zero_copy_only=False),
+        }
+    )
+
+
+def top_categories(s: pd.Series, n: int) -> pd.Series:
+    """The ``n`` most frequent values of a categorical Series, most frequent first.
+
+    Counts with ``np.bincount`` over the integer category codes and finds
+    the ``n``-th largest count with ``np.partition``, so only the values at
+    or above it are sorted. Missing values are not counted. Ties keep
+    category order, including at the cut-off.
+    """
+    codes = s.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(s.cat.categories))
+    n = min(n, counts.size)
+    if n:
+        top = np.flatnonzero(counts >= np.partition(counts, counts.size - n)[counts.size - n])
+        top = top[np.lexsort((top, -counts[top]))][:n]
+    else:
+        top = np.zeros(0, np.intp)
+    return pd.Series(counts[top], index=s.cat.categories[top], name="count")
+
+
+def downsample_minmax(y: np.ndarray, n_out: int = 1000) -> np.ndarray:
+    """Return sorted row positions that keep the min and max of ``y`` per bucket.
+
+    At most ``n_out`` positions: both endpoints plus a min and a max for
+    each of ``(n_out - 2) // 2`` buckets. Series with ``n_out`` points or
+    fewer are returned untouched, so the regular one-year daily chart is
+    unaffected.
+    """
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, max(1, (n_out - 2) // 2) + 1).astype(np.int64)
+    keep = [0, n - 1]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        seg = y[lo:hi]
+        if seg.size == 0 or np.isnan(seg).all():
+            continue
+        keep.append(lo + int(np.nanargmin(seg)))
+        keep.append(lo + int(np.nanargmax(seg)))
+    return np.unique(keep)
@@ -0,0 +1,105 @@
+"""Pre-aggregate app_Part_2.py's charts from the trip sample, once, offline.
+
+Writes four small Parquet tables to ``Data/Processed/sample_summary/``:
+
+- ``daily.parquet``: date, trips, avg_temp
+- ``dow.parquet``: day_of_week, trip_count (Monday first)
+- ``top_stations.parquet``: start_station_name, trip_count (top TOP_N_MAX,
+  the Popular Stations slider maximum)
+- ``top_routes.parquet``: start/end station names and coordinates, trips
+  (top 300 station pairs, the same routes as the exported Kepler.gl map)
+
+With every rider type selected (the default), app_Part_2.py charts straight
+from these when they are at least as new as the sample, so those pages never
+load the trip-level sample; the map page draws ``top_routes`` when no
+exported Kepler.gl HTML is present. Rebuild after the sample changes.
+
+Usage (from the repository root):
+
+    python tools/build_summaries.py
+    python tools/build_summaries.py path/to/sample.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Run as a script from the repository root: make the citibike package importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from citibike.io import read_table  # noqa: E402
+from citibike.summaries import DAY_NAMES, SAMPLE_PATH, SUMMARY_DIR, TOP_N_MAX  # noqa: E402
+from citibike.transforms import daily_from_trips, parse_dates, top_categories  # noqa: E402
+
+# ----------------------------
+# Inputs / outputs used by app_Part_2.py (paths and sizes in citibike.summaries)
+# ----------------------------
+TOP_ROUTES = 300
+ROUTE_COLUMNS = ["start_station_name", "end_station_name", "start_lat", "start_lng", "end_lat", "end_lng"]
+
+
+def build(sample_path: str) -> dict:
+    """Return the summary frames for ``sample_path``, keyed by file stem."""
+    df = read_table(sample_path, columns=["ride_id", "started_at", "date", "TAVG", *ROUTE_COLUMNS])
+    dates = parse_dates(df["date"]) if "date" in df.columns else parse_dates(df["started_at"]).dt.normalize()
+    temps = pd.to_numeric(df["TAVG"], errors="coerce") if "TAVG" in df.columns else pd.Series(np.nan, index=df.index)
+    counted = df["ride_id"].notna() if "ride_id" in df.columns else pd.Series(True, index=df.index)
+
+    daily = daily_from_trips(dates, temps, counted)
+    summaries = {
+        "daily": daily.dropna(subset=["avg_temp"]).reset_index(drop=True),
+        "dow": pd.DataFrame(
+            {
+                "day_of_week": DAY_NAMES,
+                "trip_count": np.bincount(dates.dropna().dt.dayofweek.to_numpy(), minlength=7),
+            }
+        ),
+    }
+    if "start_station_name" in df.columns:
+        # Same counting (and tie order) as the dashboard's station_counts
+        counts = top_categories(df["start_station_name"].astype("category"), TOP_N_MAX)
+        summaries["top_stations"] = (
+            counts[counts > 0]
+            .rename_axis("start_station_name")
+            .reset_index(name="trip_count")
+        )
+    if set(ROUTE_COLUMNS) <= set(df.columns):
+        summaries["top_routes"] = top_routes(df[ROUTE_COLUMNS])
+    return summaries
+
+
+def top_routes(df: pd.DataFrame, n: int = TOP_ROUTES) -> pd.DataFrame:
+    """The ``n`` busiest start -> end station pairs with mean coordinates."""
+    keys = ["start_station_name", "end_station_name"]
+    df = df.astype({k: "category" for k in keys})
+    routes = df.groupby(keys, observed=True, sort=False).agg(
+        trips=("start_lat", "size"),
+        start_lat=("start_lat", "mean"),
+        start_lng=("start_lng", "mean"),
+        end_lat=("end_lat", "mean"),
+        end_lng=("end_lng", "mean"),
+    )
+    return routes.nlargest(n, "trips").reset_index()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sample", nargs="?", default=SAMPLE_PATH, help="trip sample CSV")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.sample):
+        print(f"missing sample: {args.sample}")
+        return 1
+
+    os.makedirs(SUMMARY_DIR, exist_ok=True)
+    for name, frame in build(args.sample).items():
+        out_path = os.path.join(SUMMARY_DIR, f"{name}.parquet")
+        frame.to_parquet(out_path, index=False)
+        print(f"{out_path} ({len(frame):,} rows)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
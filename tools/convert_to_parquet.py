@@ -0,0 +1,62 @@
+"""Convert the dashboards' CSV inputs to Parquet sidecars, once, offline.
+
+Each ``<name>.csv`` gets a ``<name>.csv.parquet`` next to it. The dashboards
+read the sidecar when it is newer than the CSV, so running this before a
+deploy means the first page load never has to parse CSV.
+
+Usage (from the repository root):
+
+    python tools/convert_to_parquet.py            # default inputs
+    python tools/convert_to_parquet.py a.csv b.csv
+"""
+import argparse
+import os
+import sys
+
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# Run as a script from the repository root: make the citibike package importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from citibike.io import sidecar_table  # noqa: E402
+
+# ----------------------------
+# Inputs used by Dashboard-final.py, app.py and app_Part_2.py
+# ----------------------------
+DEFAULT_INPUTS = [
+    "Data/Processed/trips_weather.csv",
+    "Data/Processed/top20_station.csv",
+    "Data/Processed/citibike_weather_daily_2022.csv",
+    "Data/Processed/daily_trips_2022.csv",
+    "Data/Processed/sample_citibike_2022.csv",
+    "citibike_weather_2022.csv",
+]
+
+
+def convert(csv_path: str) -> str:
+    """Write ``csv_path + ".parquet"`` (zstd) and return its path."""
+    # Multithreaded Arrow parser; same layout as read_table's first load
+    table = sidecar_table(pacsv.read_csv(csv_path))
+
+    out_path = csv_path + ".parquet"
+    pq.write_table(table, out_path, compression="zstd")
+    return out_path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", help="CSV files (default: the dashboards' inputs)")
+    args = parser.parse_args(argv)
+
+    for path in args.paths or DEFAULT_INPUTS:
+        if not os.path.exists(path):
+            print(f"skip (missing): {path}")
+            continue
+        out_path = convert(path)
+        print(f"{path} -> {out_path} ({os.path.getsize(path):,} -> {os.path.getsize(out_path):,} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
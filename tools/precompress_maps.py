@@ -0,0 +1,49 @@
+"""Gzip the exported Kepler.gl maps next to the originals, once, offline.
+
+Each ``<map>.html`` gets a ``<map>.html.gz``. The dashboards decompress that
+into memory once per process when it is at least as new as the HTML.
+
+Usage (from the repository root):
+
+    python tools/precompress_maps.py              # default maps
+    python tools/precompress_maps.py some_map.html
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sys
+
+# ----------------------------
+# Maps embedded by Dashboard-final.py, app.py and app_Part_2.py
+# ----------------------------
+DEFAULT_MAPS = [
+    "Notebooks/MAPPS/kepler_top300.html",
+    "maps/kepler_top300.html",
+]
+
+
+def compress(html_path: str) -> str:
+    """Write ``html_path + ".gz"`` at maximum compression and return its path."""
+    out_path = html_path + ".gz"
+    with open(html_path, "rb") as src, gzip.open(out_path, "wb", compresslevel=9) as dst:
+        shutil.copyfileobj(src, dst)
+    return out_path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", help="HTML files (default: the dashboards' maps)")
+    args = parser.parse_args(argv)
+
+    for path in args.paths or DEFAULT_MAPS:
+        if not os.path.exists(path):
+            print(f"skip (missing): {path}")
+            continue
+        out_path = compress(path)
+        print(f"{path} -> {out_path} ({os.path.getsize(path):,} -> {os.path.getsize(out_path):,} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())